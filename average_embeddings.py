@@ -8,6 +8,10 @@ the mean vector of all submission embeddings for a given problem.
 The script then replaces the original list of embeddings with this average embedding
 in the JSON files, thereby creating a new set of JSON files that contain
 average embeddings for each problem.
+Alongside the averages, the script stores the running sum and count of the
+embeddings for every (problem, language) pair, together with the IDs of the
+counted submissions, in the 'running_sums' directory, one JSON file per language. These let 'incremental_update.py' fold new or
+removed submissions into the averages without rerunning the whole chain.
 """
 
 # Import necessary libraries
@@ -19,9 +23,14 @@ from tqdm import tqdm
 # Define directories
 source_dir = 'updatedJsons'     # Directory containing the filtered JSON files
 output_dir = 'average_embeddings'  # Directory to save the updated JSON files with average embeddings
+sums_dir = 'running_sums'       # Directory to save the running sums and counts for each language
 
-# Create average directory if it does not exist
+# Create average and running sums directories if they do not exist
 os.makedirs(output_dir, exist_ok=True)
+os.makedirs(sums_dir, exist_ok=True)
+
+# Running sums and counts for each language, keyed by problem
+running_sums = {}
 
 # Get list of JSON files in the 'updatedJsons' directory
 json_files = os.listdir(source_dir)
@@ -33,13 +42,22 @@ for json_filename in tqdm(json_files, desc='Processing JSON files', unit='file')
         # Load the JSON data
         data = json.load(json_file)
 
+    # Get the language from the filename (e.g. 'Python_submissions_part0.json' -> 'Python')
+    language = json_filename.split('_submissions')[0]
+    language_sums = running_sums.setdefault(language, {})
+
     # Loop through each problem in the JSON data
     for problem_id in list(data.keys()):
         # Collect all embeddings associated with the problem
         embeddings = [list(submission.values())[0] for submission in data[problem_id]]
         
+        # Keep the running sum and count so the average can be updated later
+        embedding_sum = np.sum(embeddings, axis=0)
+        submission_ids = [list(submission.keys())[0] for submission in data[problem_id]]
+        language_sums[problem_id] = {"sum": embedding_sum.tolist(), "count": len(embeddings), "submissions": sorted(submission_ids)}
+
         # Calculate the average embedding across all submissions for the problem
-        average_embedding = list(np.mean(embeddings, axis=0))
+        average_embedding = list(embedding_sum / len(embeddings))
         
         # Replace the list of embeddings with the average embedding
         data[problem_id] = average_embedding
@@ -47,3 +65,8 @@ for json_filename in tqdm(json_files, desc='Processing JSON files', unit='file')
     # Save the updated JSON data in the 'average_embeddings' directory
     with open(os.path.join(output_dir, json_filename), 'w') as average_json_file:
         json.dump(data, average_json_file, indent=2)
+
+# Save the running sums and counts for each language in the 'running_sums' directory
+for language, language_sums in running_sums.items():
+    with open(os.path.join(sums_dir, f'{language}.json'), 'w') as sums_json_file:
+        json.dump(language_sums, sums_json_file)
@@ -0,0 +1,254 @@
+#Author: Erfan Raoofian
+#License: Apache 2.0
+"""
+This script updates the "codenet" Qdrant collection incrementally from a delta
+of new or removed accepted submissions, instead of rerunning the whole chain.
+The delta is a JSON file with an "added" and a "removed" section. Each section
+maps a language to the same structure as the files produced by
+'create_json_for_each_language.py': a dictionary where each problem is a key and
+the value is a list of submissions, each being a dictionary with the submission ID
+as the key and the code as the value. Submissions in the delta are expected to be
+accepted already.
+Only the submissions in the delta are embedded with the SentenceTransformer model.
+Their embeddings are added to (or subtracted from) the running sums and counts
+stored in the 'running_sums' directory by 'average_embeddings.py', and only the
+affected (problem, language) points are upserted to the Qdrant server, using the
+same uuid5 point IDs as 'insert_qdrant.py'. If a problem has no submissions left
+for a language, its point is deleted from the collection.
+The running sums also keep the IDs of the counted submissions, so added submissions
+that are already counted and removed submissions that were never counted are skipped.
+The running sums of all languages are saved only after the Qdrant server has been
+updated, each file being replaced atomically, so a failed run can be repeated with
+the same delta.
+"""
+
+# Import necessary libraries
+import os
+import json
+import uuid
+import numpy as np
+from bs4 import BeautifulSoup
+from tqdm import tqdm
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from sentence_transformers import SentenceTransformer
+
+# Define paths
+delta_file = 'delta.json'          # JSON file with the added and removed submissions
+sums_dir = 'running_sums'          # Directory containing the running sums and counts for each language
+html_dir = 'problem_descriptions'  # Directory containing HTML files with problem descriptions
+model_path = 'sroberta/'
+
+# Load the SentenceTransformer model from the local directory
+model = SentenceTransformer(model_path)
+
+# Initialize a Qdrant client
+client = QdrantClient(host='localhost', port=6333)
+
+def get_code_embeddings(codes, batch_size):
+    """Computes embeddings for the given codes using the SentenceTransformer model.
+
+    Args:
+        codes (list[str]): The codes to compute embeddings for.
+        batch_size (int): The size of the batches to split the codes into when computing embeddings.
+
+    Returns:
+        list[list[float]]: The computed embeddings.
+    """
+    code_embeddings = []
+    for i in range(0, len(codes), batch_size):
+        batch = codes[i:i + batch_size]
+        code_embeddings.extend(model.encode(batch))
+    return code_embeddings
+
+# Initial batch size
+initial_batch_size = 1024
+
+def embed_submissions(submissions):
+    """Computes the sum of the embeddings of the given submissions.
+
+    Args:
+        submissions (list[dict]): The submissions, each a dictionary with the submission ID as the key and the code as the value.
+
+    Returns:
+        numpy.ndarray: The sum of the computed embeddings.
+    """
+    codes = [code for submission in submissions for code in submission.values()]
+
+    batch_size = initial_batch_size
+
+    while batch_size > 0:
+        try:
+            return np.sum(get_code_embeddings(codes, batch_size), axis=0)
+        except RuntimeError:
+            batch_size //= 2
+
+    raise RuntimeError('Could not compute embeddings even with a batch size of 1')
+
+def read_problem_description(problem_id):
+    """Reads the problem description from the corresponding HTML file.
+
+    Args:
+        problem_id (str): The problem ID (e.g. 'p1').
+
+    Returns:
+        str or None: The text of the problem description, or None if the HTML file does not exist.
+    """
+    html_filename = os.path.join(html_dir, f"p{int(problem_id[1:]):05}.html")
+
+    if not os.path.isfile(html_filename):
+        print(f"HTML file {html_filename} does not exist. Skipping...")
+        return None
+
+    try:
+        with open(html_filename, 'r', encoding='utf-8') as html_file:
+            soup = BeautifulSoup(html_file, 'html.parser')
+            return soup.text
+    except UnicodeDecodeError:
+        return "#non english problem description#"
+
+# Load the delta
+with open(delta_file, 'r', encoding='utf-8') as file:
+    delta = json.load(file)
+
+added = delta.get('added', {})
+removed = delta.get('removed', {})
+
+# Updated running sums and changed problems for each language, kept in memory
+# until every language has been applied to the Qdrant server
+updated_sums = {}
+changed_problems_by_language = {}
+
+# Loop through each language that appears in the delta and update its running sums
+for language in tqdm(sorted(set(added) | set(removed)), desc='Embedding submissions', unit='language'):
+    sums_path = os.path.join(sums_dir, f'{language}.json')
+
+    # Load the running sums and counts for the language, if any
+    if os.path.isfile(sums_path):
+        with open(sums_path, 'r') as sums_json_file:
+            language_sums = json.load(sums_json_file)
+    else:
+        language_sums = {}
+
+    language_added = added.get(language, {})
+    language_removed = removed.get(language, {})
+
+    # Update the running sums and counts of the affected problems
+    changed_problems = set()
+    for problem_id in sorted(set(language_added) | set(language_removed)):
+        entry = language_sums.get(problem_id)
+        if entry is None and not language_added.get(problem_id):
+            print(f"No running sum for {problem_id} in {language}. Skipping removed submissions...")
+            continue
+
+        counted = set(entry["submissions"]) if entry is not None else set()
+
+        # Only add submissions that are not counted yet
+        new_submissions = []
+        for submission in language_added.get(problem_id, []):
+            submission_id = list(submission.keys())[0]
+            if submission_id not in counted:
+                counted.add(submission_id)
+                new_submissions.append(submission)
+
+        # Only remove submissions that are counted
+        removed_submissions = []
+        for submission in language_removed.get(problem_id, []):
+            submission_id = list(submission.keys())[0]
+            if submission_id in counted:
+                counted.remove(submission_id)
+                removed_submissions.append(submission)
+            else:
+                print(f"Submission {submission_id} of {problem_id} in {language} is not counted. Skipping...")
+
+        if not new_submissions and not removed_submissions:
+            continue
+
+        count = (entry["count"] if entry is not None else 0) + len(new_submissions) - len(removed_submissions)
+        if count < 0:
+            print(f"Running count for {problem_id} in {language} would become {count}. Skipping...")
+            continue
+
+        embedding_sum = np.array(entry["sum"]) if entry is not None else 0
+        if new_submissions:
+            embedding_sum = embedding_sum + embed_submissions(new_submissions)
+        if removed_submissions:
+            embedding_sum = embedding_sum - embed_submissions(removed_submissions)
+
+        language_sums[problem_id] = {"sum": np.asarray(embedding_sum).tolist(), "count": count, "submissions": sorted(counted)}
+        changed_problems.add(problem_id)
+
+    if changed_problems:
+        updated_sums[language] = language_sums
+        changed_problems_by_language[language] = changed_problems
+
+# Loop through each changed language and update its points in the Qdrant collection
+for language, changed_problems in tqdm(changed_problems_by_language.items(), desc='Updating Qdrant', unit='language'):
+    language_sums = updated_sums[language]
+
+    # Initialize lists to store data
+    ids = []
+    embeddings = []
+    payloads = []
+    deleted_ids = []
+
+    # Prepare the points of the affected problems
+    for problem_id in sorted(changed_problems):
+        point_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f'codenet/{language}/{problem_id}'))
+        entry = language_sums[problem_id]
+
+        # If the problem has no submissions left, remove it
+        if entry["count"] == 0:
+            del language_sums[problem_id]
+            deleted_ids.append(point_id)
+            continue
+
+        problem_description = read_problem_description(problem_id)
+        if problem_description is None:
+            continue
+
+        ids.append(point_id)
+        embeddings.append((np.array(entry["sum"]) / entry["count"]).tolist())
+        payloads.append({"problem_number": problem_id, "problem_description": problem_description})
+
+        # If we have a batch of 10 problems, push them to the Qdrant collection
+        if len(ids) == 10:
+            client.upsert(
+                collection_name="codenet",
+                points=models.Batch(
+                    ids=ids,
+                    vectors=embeddings,
+                    payloads=payloads
+                ),
+            )
+            # Clear the lists
+            ids = []
+            embeddings = []
+            payloads = []
+
+    # If we have a remaining batch smaller than 10, push it to the Qdrant collection
+    if ids:
+        client.upsert(
+            collection_name="codenet",
+            points=models.Batch(
+                ids=ids,
+                vectors=embeddings,
+                payloads=payloads
+            ),
+        )
+
+    # Delete the points of the problems without any submissions left
+    if deleted_ids:
+        client.delete(
+            collection_name="codenet",
+            points_selector=models.PointIdsList(points=deleted_ids),
+        )
+
+# Save the updated running sums for each changed language, replacing each file atomically
+os.makedirs(sums_dir, exist_ok=True)
+for language, language_sums in updated_sums.items():
+    sums_path = os.path.join(sums_dir, f'{language}.json')
+    temp_path = sums_path + '.tmp'
+    with open(temp_path, 'w') as sums_json_file:
+        json.dump(language_sums, sums_json_file)
+    os.replace(temp_path, sums_path)
@@ -13,7 +13,8 @@ It also prepares the payload data to be pushed to the Qdrant server.
 The script batches the data and sends it to the Qdrant server once
 it has processed 10 problems. The upsert function is used,
 which inserts new data or updates existing data. The data sent includes a unique ID
-for each problem (generated using the uuid library), the problem's embedding,
+for each problem (derived from the language and problem ID with uuid5, so that
+'incremental_update.py' can later upsert the same point), the problem's embedding,
 and the payload (problem number and problem description).
 if an HTML file does not exist for a problem or if the file cannot be read due to
 a UnicodeDecodeError, the problem is skipped and a message is printed to the console.
@@ -60,6 +61,9 @@ for json_filename in tqdm(json_files, desc='Processing JSON files', unit='file')
         # Load the JSON data
         data = json.load(json_file)
 
+    # Get the language from the filename (e.g. 'Python_submissions_part0.json' -> 'Python')
+    language = json_filename.split('_submissions')[0]
+
     # Loop through each problem in the JSON data
     for problem_id in list(data.keys()):
         # Generate the filename for the corresponding HTML file
@@ -78,7 +82,7 @@ for json_filename in tqdm(json_files, desc='Processing JSON files', unit='file')
             continue
 
         # Append the data to the lists
-        ids.append(str(uuid.uuid4()))
+        ids.append(str(uuid.uuid5(uuid.NAMESPACE_URL, f'codenet/{language}/{problem_id}')))
         problem_numbers.append(problem_id)
         problem_descriptions.append(problem_description)
         embeddings.append(data[problem_id])